@@ -1,15 +1,18 @@
 """FastAPI application entry point."""
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 
 from src.api.routes import router, initialize_chatbot
+from src.config import get_settings
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events."""
-    # Startup: Initialize the chatbot
+    # Startup: Initialize the chatbot (runs once per worker process, so each
+    # worker opens its own Chroma client)
     print("Starting up RAG Chatbot API...")
     initialize_chatbot()
     yield
@@ -22,7 +25,8 @@ app = FastAPI(
     title="RAG-Powered Transactional Chatbot",
     description="A Retrieval-Augmented Generation chatbot for answering questions about customer transactions",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -40,9 +44,19 @@ app.include_router(router, tags=["Chatbot"])
 
 if __name__ == "__main__":
     import uvicorn
+    from src.vector_store import setup_vector_store
+    
+    workers = get_settings().web_concurrency
+    if workers > 1:
+        # Build and ingest the store once here, so the workers only load it instead
+        # of all ingesting into the same Chroma directory at once
+        setup_vector_store()
+    
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True
+        loop="uvloop",
+        http="httptools",
+        workers=workers
     )
@@ -1,7 +1,8 @@
 """Reset vector store to ensure all transactions are properly indexed."""
 import os
+import asyncio
 import shutil
-from src.vector_store import setup_vector_store
+from src.vector_store import asetup_vector_store
 
 def reset_vector_store():
     # Remove existing vector store
@@ -12,7 +13,7 @@ def reset_vector_store():
     
     # Create fresh vector store
     print("Creating fresh vector store...")
-    manager = setup_vector_store(force_recreate=True)
+    manager = asyncio.run(asetup_vector_store(force_recreate=True))
     
     # Verify all transactions are loaded
     collection = manager.vectorstore._collection
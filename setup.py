@@ -36,7 +36,7 @@ def setup_vector_store():
     print("\n📦 Setting up vector store...")
     
     try:
-        from src.vector_store import setup_vector_store
+        from src.runtime import get_vector_store
         
         # Check if vector store already exists
         chroma_path = Path("./chroma_db")
@@ -47,7 +47,8 @@ def setup_vector_store():
         else:
             print("Vector store already exists, loading...")
         
-        manager = setup_vector_store(force_recreate=force_recreate)
+        # A missing store is created and populated on first use
+        manager = get_vector_store()
         print("✅ Vector store ready!")
         return True
     
@@ -61,9 +62,10 @@ def test_chatbot():
     print("\n🤖 Testing chatbot...")
     
     try:
-        from src.rag_chain import RAGChatbot
+        from src.runtime import get_chatbot
         
-        chatbot = RAGChatbot()
+        # Reuses the vector store built by setup_vector_store()
+        chatbot = get_chatbot()
         result = chatbot.query("What is Amit's total spending?")
         
         print(f"\n📝 Test Query: What is Amit's total spending?")
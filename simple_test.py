@@ -6,10 +6,13 @@ import json
 
 API_BASE_URL = "http://localhost:8000"
 
+# Shared session so all test calls reuse one keep-alive connection
+SESSION = requests.Session()
+
 def test_health():
     """Test the health endpoint."""
     try:
-        response = requests.get(f"{API_BASE_URL}/health")
+        response = SESSION.get(f"{API_BASE_URL}/health")
         print("Health Check:")
         print(json.dumps(response.json(), indent=2))
         return response.status_code == 200
@@ -20,7 +23,7 @@ def test_health():
 def test_transactions():
     """Test the transactions endpoint."""
     try:
-        response = requests.get(f"{API_BASE_URL}/transactions")
+        response = SESSION.get(f"{API_BASE_URL}/transactions")
         print("\nTransactions:")
         print(json.dumps(response.json(), indent=2))
         return response.status_code == 200
@@ -32,7 +35,7 @@ def test_chat(query):
     """Test the chat endpoint."""
     try:
         payload = {"query": query}
-        response = requests.post(
+        response = SESSION.post(
             f"{API_BASE_URL}/chat",
             headers={"Content-Type": "application/json"},
             json=payload
@@ -45,6 +48,31 @@ def test_chat(query):
         print(f"Chat test failed: {e}")
         return False
 
+def test_chat_stream(query):
+    """Test the streaming chat endpoint."""
+    try:
+        payload = {"query": query}
+        response = SESSION.post(
+            f"{API_BASE_URL}/chat/stream",
+            headers={"Content-Type": "application/json"},
+            json=payload,
+            stream=True
+        )
+        print(f"\nStreaming Chat Query: {query}")
+        print("Response: ", end="", flush=True)
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data: "):
+                continue
+            data = line[len("data: "):]
+            if data == "[DONE]":
+                break
+            print(json.loads(data)["token"], end="", flush=True)
+        print()
+        return response.status_code == 200
+    except Exception as e:
+        print(f"Streaming chat test failed: {e}")
+        return False
+
 def main():
     """Run all tests."""
     print("=== RAG Chatbot API Test ===\n")
@@ -71,6 +99,9 @@ def main():
     for query in test_queries:
         test_chat(query)
         print("-" * 50)
+    
+    print("\n=== Testing Streaming Chat ===")
+    test_chat_stream(test_queries[1])
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
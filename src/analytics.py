@@ -0,0 +1,209 @@
+"""Precomputed transaction aggregates for answering common analytical queries."""
+import re
+import calendar
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numba import njit
+
+from src.data_loader import get_transactions_file_key, load_transactions, normalize_question
+
+# Month name/abbreviation -> month number, e.g. "january" / "jan" -> 1
+MONTHS = {
+    name.lower(): number
+    for number in range(1, 13)
+    for name in (calendar.month_name[number], calendar.month_abbr[number])
+}
+
+_MONTH_NAMES = "|".join(MONTHS)
+_MONTH_PATTERN = re.compile(rf"\b({_MONTH_NAMES})\b")
+
+# Supported question shapes, matched against the whole normalized question
+# (lowercased, whitespace collapsed, trailing punctuation stripped). Anything
+# else, e.g. a total restricted to a product or month, goes to the LLM.
+_NAME = r"(?P<customer>[a-z][a-z' -]*?)"
+_CUSTOMER_TOTAL_TEMPLATES = [
+    re.compile(rf"(?:(?:what is|what's|what was) )?{_NAME}(?:'s|') total (?:spending|spend|expenditure|amount spent)"),
+    re.compile(
+        rf"(?:(?:what is|what's|what was) )?(?:the )?total (?:spending|spend|expenditure|amount spent|amount) "
+        rf"(?:of|by|for) {_NAME}"
+    ),
+    re.compile(rf"(?:(?:what is|what's|what was) )?(?:the )?total (?:amount )?spent by {_NAME}"),
+    re.compile(rf"how much (?:did|has) {_NAME} (?:spend|spent)(?: in total| altogether| overall)?"),
+]
+_MOST_PURCHASED_TEMPLATES = [
+    re.compile(
+        r"(?:which|what) (?:product|item) (?:was|is|has been) (?:purchased|bought|sold|ordered) "
+        r"(?:the )?most(?: often| frequently)?"
+    ),
+    re.compile(
+        r"(?:(?:what is|what's|which is) )?(?:the )?most (?:frequently |often |commonly )?"
+        r"(?:purchased|bought|popular|sold|ordered) (?:product|item)"
+    ),
+]
+_MONTHLY_SALES_TEMPLATES = [
+    re.compile(
+        rf"(?:what (?:are|were|is|was) )?(?:the )?(?:total )?(?:sales|revenue) (?:for|in|during|of) "
+        rf"(?P<month>{_MONTH_NAMES}),? (?P<year>\d{{4}})"
+    ),
+    re.compile(
+        rf"(?:what (?:are|were|is|was) )?(?:the )?(?P<month>{_MONTH_NAMES}),? (?P<year>\d{{4}}) "
+        rf"(?:total )?(?:sales|revenue)"
+    ),
+]
+
+# Qualifiers that change what is being asked, so the precomputed totals don't apply
+_EXCLUDED_PATTERN = re.compile(
+    r"\b(expensive|cheap(?:est)?|customers?|other than|except|excluding|without|average|each|per|"
+    r"not|only|least)\b"
+)
+
+
+def _fullmatch(templates: List[re.Pattern], text: str) -> Optional[re.Match]:
+    """Return the match of the first template matching the whole text, if any."""
+    return next((match for match in (t.fullmatch(text) for t in templates) if match), None)
+
+
+@njit(cache=True)
+def sum_by_group(values: np.ndarray, group_ids: np.ndarray, n_groups: int) -> np.ndarray:
+    """Sum values per group id (a serial scatter-add, so threads never race on a group)."""
+    out = np.zeros(n_groups)
+    for i in range(values.shape[0]):
+        out[group_ids[i]] += values[i]
+    return out
+
+
+@njit(cache=True)
+def count_by_group(group_ids: np.ndarray, n_groups: int) -> np.ndarray:
+    """Count rows per group id."""
+    out = np.zeros(n_groups, dtype=np.int64)
+    for i in range(group_ids.shape[0]):
+        out[group_ids[i]] += 1
+    return out
+
+
+def format_amount(amount: float) -> str:
+    """Format an amount in Indian Rupees, e.g. Rs.55,700."""
+    return f"Rs.{amount:,.0f}"
+
+
+class TransactionAnalytics:
+    """Answers deterministic aggregation questions without calling the LLM."""
+
+    def __init__(self, transactions: Optional[List[Dict]] = None):
+        """
+        Load transactions and precompute the aggregates.
+
+        Args:
+            transactions: Transaction dictionaries (loaded from file if not given)
+        """
+        self.df = pd.DataFrame(transactions if transactions is not None else load_transactions())
+
+        # Contiguous arrays for the compiled aggregation kernels
+        self.amounts = self.df["amount"].to_numpy(dtype=np.float64)
+        self.dates = self.df["date"].str.replace("-", "").astype(np.int64).to_numpy()  # YYYYMMDD
+        self.months = self.dates // 100  # YYYYMM
+        customer_ids, customers = pd.factorize(self.df["customer"])
+        product_ids, products = pd.factorize(self.df["product"])
+        month_ids, months = pd.factorize(self.months)
+
+        self.customer_totals = pd.Series(
+            sum_by_group(self.amounts, customer_ids, len(customers)), index=customers
+        )
+        self.product_counts = pd.Series(
+            count_by_group(product_ids, len(products)), index=products
+        ).sort_values(ascending=False, kind="stable")
+        self.monthly_sales = pd.Series(
+            sum_by_group(self.amounts, month_ids, len(months)), index=months
+        )
+
+        self._customers = {name.lower(): name for name in self.customer_totals.index}
+        self._products = [name.lower() for name in self.product_counts.index]
+
+    def _records(self, mask: pd.Series) -> List[Dict]:
+        """Get the transactions matching a boolean mask as metadata dictionaries."""
+        return self.df[mask].to_dict(orient="records")
+
+    @staticmethod
+    def _mentions(question: str, names: List[str]) -> bool:
+        """Whether the question names any of the given (lowercase) names."""
+        return any(re.search(rf"\b{re.escape(name)}\b", question) for name in names)
+
+    def answer(self, question: str) -> Optional[Tuple[str, List[Dict]]]:
+        """
+        Try to answer a question from the precomputed aggregates.
+
+        Only three question shapes are supported: a named customer's total spending,
+        the most purchased product, and the total sales for a month. Questions that
+        add a product, a customer, a month or another qualifier are left to the LLM.
+
+        Args:
+            question: User's question
+
+        Returns:
+            Tuple of (answer, source transactions), or None if the question
+            is not a recognised aggregation and needs the LLM
+        """
+        q = normalize_question(question)
+        if _EXCLUDED_PATTERN.search(q) or self._mentions(q, self._products):
+            return None
+
+        # "What is Amit's total spending?"
+        match = _fullmatch(_CUSTOMER_TOTAL_TEMPLATES, q)
+        if match and not _MONTH_PATTERN.search(q):
+            customer = self._customers.get(match.group("customer").strip())
+            if customer is None:
+                return None
+            total = self.customer_totals[customer]
+            return (
+                f"{customer}'s total spending is {format_amount(total)}.",
+                self._records(self.df["customer"] == customer)
+            )
+
+        # "Which product was purchased most often?"
+        if _fullmatch(_MOST_PURCHASED_TEMPLATES, q):
+            top_count = self.product_counts.iloc[0]
+            top_products = self.product_counts[self.product_counts == top_count].index.tolist()
+            times = "time" if top_count == 1 else "times"
+            if len(top_products) == 1:
+                text = f"The most purchased product is {top_products[0]} ({top_count} {times})."
+            else:
+                text = (
+                    f"No single product stands out; {', '.join(top_products)} "
+                    f"were each purchased {top_count} {times}."
+                )
+            return text, self._records(self.df["product"].isin(top_products))
+
+        # "What are the total sales for January 2024?"
+        match = _fullmatch(_MONTHLY_SALES_TEMPLATES, q)
+        if match and not self._mentions(q, list(self._customers)):
+            month_name, year = match.group("month"), match.group("year")
+            month_key = int(year) * 100 + MONTHS[month_name]
+            if month_key not in self.monthly_sales.index:
+                return None
+            label = f"{calendar.month_name[MONTHS[month_name]]} {year}"
+            return (
+                f"The total sales for {label} are {format_amount(self.monthly_sales[month_key])}.",
+                self._records(self.months == month_key)
+            )
+
+        return None
+
+
+@lru_cache(maxsize=2)
+def _analytics_cached(path: str, mtime: float) -> TransactionAnalytics:
+    """Build the aggregates for a transactions file (cached per path and mtime)."""
+    return TransactionAnalytics(load_transactions(path))
+
+
+def get_analytics() -> TransactionAnalytics:
+    """
+    Get the aggregates for the current transactions file, rebuilt whenever
+    the file changes (like the data loader's caches).
+
+    Returns:
+        TransactionAnalytics for the current data
+    """
+    return _analytics_cached(*get_transactions_file_key())
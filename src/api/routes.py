@@ -1,6 +1,8 @@
 """FastAPI routes for the RAG chatbot."""
-from typing import Dict, Any
-from fastapi import APIRouter, HTTPException, Depends
+import json
+from typing import AsyncIterator, Dict, Any, List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi.responses import StreamingResponse
 from src.api.schemas import (
     ChatRequest,
     ChatResponse,
@@ -10,6 +12,7 @@ from src.api.schemas import (
 )
 from src.data_loader import load_transactions
 from src.rag_chain import RAGChatbot
+from src import runtime
 
 # Create router
 router = APIRouter()
@@ -17,6 +20,13 @@ router = APIRouter()
 # Global chatbot instance (will be initialized on startup)
 chatbot_instance: RAGChatbot = None
 
+# Transaction count recorded at startup, so /health does no file I/O
+_transaction_count: int = 0
+
+# Pre-serialized /transactions response and the transaction list it was built from
+_transactions_response_cache: Optional[bytes] = None
+_transactions_response_source: Optional[List[Dict]] = None
+
 
 def get_chatbot() -> RAGChatbot:
     """Dependency to get the chatbot instance."""
@@ -28,21 +38,69 @@ def get_chatbot() -> RAGChatbot:
 
 def initialize_chatbot():
     """Initialize the chatbot on app startup."""
-    global chatbot_instance
+    global chatbot_instance, _transaction_count
     try:
         print("Initializing RAG Chatbot...")
-        chatbot_instance = RAGChatbot()
+        chatbot_instance = runtime.get_chatbot()
         print("RAG Chatbot initialized successfully!")
+        # Validate the transaction data once so malformed data fails fast;
+        # responses are then built without per-item validation
+        transactions = load_transactions()
+        for txn in transactions:
+            TransactionSchema(**txn)
+        _transaction_count = len(transactions)
+        get_transactions_response()
     except Exception as e:
         print(f"Error initializing chatbot: {e}")
         raise
 
 
+def get_transactions_response() -> bytes:
+    """
+    Get the serialized transaction list response.
+    
+    load_transactions() returns the same cached list until transactions.json
+    changes, so the response is only rebuilt when the file is modified. The data
+    is validated at startup, so models are constructed without re-validation.
+    """
+    global _transactions_response_cache, _transactions_response_source
+    transactions = load_transactions()
+    if transactions is not _transactions_response_source:
+        transaction_schemas = [TransactionSchema.model_construct(**txn) for txn in transactions]
+        _transactions_response_cache = TransactionListResponse.model_construct(
+            transactions=transaction_schemas,
+            total=len(transaction_schemas)
+        ).model_dump_json().encode()
+        _transactions_response_source = transactions
+    return _transactions_response_cache
+
+
 @router.get("/health", response_model=HealthCheck)
 async def health_check():
     """
     Check the health status of the API.
     
+    Cheap enough for frequent load balancer polling: it reports the transaction
+    count recorded at startup. Use /health/deep to re-read the data file.
+    
+    Returns:
+        HealthCheck with status information
+    """
+    vector_store_ok = chatbot_instance is not None
+    
+    return HealthCheck(
+        status="healthy" if vector_store_ok else "degraded",
+        message="RAG Chatbot API is running",
+        vector_store_initialized=vector_store_ok,
+        total_transactions=_transaction_count
+    )
+
+
+@router.get("/health/deep", response_model=HealthCheck)
+async def deep_health_check():
+    """
+    Check the health status of the API, including loading the transaction data.
+    
     Returns:
         HealthCheck with status information
     """
@@ -74,13 +132,7 @@ async def get_transactions():
         List of all transactions
     """
     try:
-        transactions = load_transactions()
-        transaction_schemas = [TransactionSchema(**txn) for txn in transactions]
-        
-        return TransactionListResponse(
-            transactions=transaction_schemas,
-            total=len(transaction_schemas)
-        )
+        return Response(content=get_transactions_response(), media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading transactions: {str(e)}")
 
@@ -98,8 +150,8 @@ async def chat(request: ChatRequest, chatbot: RAGChatbot = Depends(get_chatbot))
         ChatResponse with the answer and source documents
     """
     try:
-        # Query the chatbot
-        result = chatbot.chat(request.query, use_memory=request.use_memory)
+        # Query the chatbot without blocking the event loop
+        result = await chatbot.achat(request.query, use_memory=request.use_memory)
         
         return ChatResponse(
             answer=result["answer"],
@@ -113,6 +165,29 @@ async def chat(request: ChatRequest, chatbot: RAGChatbot = Depends(get_chatbot))
         )
 
 
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, chatbot: RAGChatbot = Depends(get_chatbot)):
+    """
+    Chat with the bot, streaming the answer as Server-Sent Events.
+    
+    Each event carries a JSON object with the next answer chunk ({"token": ...});
+    the stream ends with a "[DONE]" event.
+    
+    Args:
+        request: ChatRequest containing the user's query
+        chatbot: RAGChatbot instance (injected dependency)
+        
+    Returns:
+        StreamingResponse of text/event-stream events
+    """
+    async def event_stream() -> AsyncIterator[str]:
+        async for token in chatbot.astream(request.query, use_memory=request.use_memory):
+            yield f"data: {json.dumps({'token': token})}\n\n"
+        yield "data: [DONE]\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @router.get("/")
 async def root():
     """Root endpoint with API information."""
@@ -121,8 +196,10 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
+            "health_deep": "/health/deep",
             "transactions": "/transactions",
             "chat": "/chat (POST)",
+            "chat_stream": "/chat/stream (POST, Server-Sent Events)",
             "docs": "/docs"
         }
     }
@@ -0,0 +1,57 @@
+"""Application settings, read from the environment (and .env) once per process."""
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+from dotenv import load_dotenv
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Configuration for the vector store, LLM, retrieval and caches."""
+    google_api_key: Optional[str]
+
+    # Vector store
+    vector_db_path: str
+    collection_name: str
+    embedding_model: str
+    embedding_cache_path: str
+
+    # LLM
+    llm_model: str
+    temperature: float
+
+    # Retrieval
+    top_k: int
+
+    # Response cache (disabled when unset)
+    redis_url: Optional[str]
+
+    # Server
+    web_concurrency: int
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Load the settings on first use.
+
+    Returns:
+        Settings shared by the whole process
+    """
+    load_dotenv()
+    return Settings(
+        google_api_key=os.getenv("GOOGLE_API_KEY"),
+        vector_db_path=os.getenv("VECTOR_DB_PATH", "./chroma_db"),
+        collection_name=os.getenv("COLLECTION_NAME", "transactions"),
+        embedding_model=os.getenv("EMBEDDING_MODEL", "models/gemini-embedding-001"),
+        embedding_cache_path=os.getenv("EMBEDDING_CACHE_PATH", "./.emb_cache"),
+        llm_model=os.getenv("LLM_MODEL", "gemini-1.5-flash"),
+        temperature=float(os.getenv("TEMPERATURE", 0)),
+        top_k=int(os.getenv("TOP_K_RESULTS", 50)),
+        redis_url=os.getenv("REDIS_URL") or None,
+        # Conversation memory and the local answer cache live in each process, so
+        # more than one worker splits a conversation across unrelated memories
+        web_concurrency=int(os.getenv("WEB_CONCURRENCY", 1)),
+    )
@@ -1,27 +1,68 @@
 """Data loading and preprocessing for transaction data."""
 import json
+import string
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
+try:
+    import orjson
+except ImportError:  # orjson is an optional, faster JSON parser
+    orjson = None
 
-def load_transactions(file_path: str = "transactions.json") -> List[Dict]:
+DEFAULT_TRANSACTIONS_FILE = "transactions.json"
+
+
+def _file_key(file_path: str) -> Tuple[str, float]:
+    """
+    Build a cache key for a data file from its path and modification time,
+    so cached results are refreshed whenever the file changes.
+    """
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"Transaction file not found: {file_path}")
+    return str(path), path.stat().st_mtime
+
+
+@lru_cache(maxsize=4)
+def _load_cached(path: str, mtime: float) -> List[Dict]:
+    """Read and parse a transactions file (cached per path and mtime)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data.decode('utf-8'))
+
+
+def load_transactions(file_path: str = DEFAULT_TRANSACTIONS_FILE) -> List[Dict]:
     """
     Load transaction data from JSON file.
     
+    The parsed result is cached until the file's modification time changes,
+    so callers must not mutate the returned list.
+    
     Args:
         file_path: Path to the transactions JSON file
         
     Returns:
         List of transaction dictionaries
     """
-    path = Path(file_path)
-    if not path.exists():
-        raise FileNotFoundError(f"Transaction file not found: {file_path}")
-    
-    with open(path, 'r', encoding='utf-8') as f:
-        transactions = json.load(f)
+    return _load_cached(*_file_key(file_path))
+
+
+def get_transactions_file_key(file_path: str = DEFAULT_TRANSACTIONS_FILE) -> Tuple[str, float]:
+    """
+    Identify the current version of a transactions file, for keying caches
+    derived from it.
     
-    return transactions
+    Args:
+        file_path: Path to the transactions JSON file
+        
+    Returns:
+        Tuple of (path, modification time)
+    """
+    return _file_key(file_path)
 
 
 def preprocess_transaction(transaction: Dict) -> str:
@@ -55,6 +96,27 @@ def preprocess_transaction(transaction: Dict) -> str:
     return text
 
 
+@lru_cache(maxsize=4)
+def _transaction_texts_cached(path: str, mtime: float) -> List[str]:
+    """Build transaction text descriptions (cached per path and mtime)."""
+    return [preprocess_transaction(txn) for txn in _load_cached(path, mtime)]
+
+
+@lru_cache(maxsize=4)
+def _transaction_metadata_cached(path: str, mtime: float) -> List[Dict]:
+    """Build transaction metadata (cached per path and mtime)."""
+    return [
+        {
+            "id": txn.get("id"),
+            "customer": txn.get("customer"),
+            "product": txn.get("product"),
+            "amount": txn.get("amount"),
+            "date": txn.get("date")
+        }
+        for txn in _load_cached(path, mtime)
+    ]
+
+
 def get_all_transaction_texts() -> List[str]:
     """
     Load all transactions and convert them to text descriptions.
@@ -62,8 +124,7 @@ def get_all_transaction_texts() -> List[str]:
     Returns:
         List of formatted transaction strings
     """
-    transactions = load_transactions()
-    return [preprocess_transaction(txn) for txn in transactions]
+    return _transaction_texts_cached(*_file_key(DEFAULT_TRANSACTIONS_FILE))
 
 
 def get_transaction_metadata() -> List[Dict]:
@@ -73,17 +134,22 @@ def get_transaction_metadata() -> List[Dict]:
     Returns:
         List of metadata dictionaries
     """
-    transactions = load_transactions()
-    return [
-        {
-            "id": txn.get("id"),
-            "customer": txn.get("customer"),
-            "product": txn.get("product"),
-            "amount": txn.get("amount"),
-            "date": txn.get("date")
-        }
-        for txn in transactions
-    ]
+    return _transaction_metadata_cached(*_file_key(DEFAULT_TRANSACTIONS_FILE))
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a user question: lowercase it, collapse whitespace and strip trailing
+    punctuation. Shared by the response cache key, the query embedding cache and the
+    analytics matcher, so they all treat the same phrasings as equal.
+    
+    Args:
+        question: User's question
+        
+    Returns:
+        Normalized question text
+    """
+    return " ".join(question.lower().split()).rstrip(string.punctuation + " ")
 
 
 if __name__ == "__main__":
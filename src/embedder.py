@@ -0,0 +1,94 @@
+"""Async micro-batching of query embeddings."""
+import asyncio
+from typing import List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+# Default batching window and size
+MAX_BATCH_SIZE = 32
+MAX_WAIT_SECONDS = 0.015
+
+
+class BatchingEmbedder:
+    """
+    Coalesces concurrent query embedding requests into batched calls.
+
+    Requests arriving within a short window are collected by a background task
+    and embedded with a single embed_documents call, so concurrent chats share
+    one round-trip to the embeddings API instead of making one each.
+    """
+
+    def __init__(
+        self,
+        inner: Embeddings,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait: float = MAX_WAIT_SECONDS
+    ):
+        """
+        Initialize the batching embedder.
+
+        Args:
+            inner: Embeddings used to embed each batch
+            max_batch_size: Maximum number of texts per batch
+            max_wait: Seconds to wait for more requests after the first one arrives
+        """
+        self.inner = inner
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional["asyncio.Queue[Tuple[str, asyncio.Future]]"] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def _ensure_worker(self) -> None:
+        """Start the batching task on the running event loop if it is not running yet."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a query, batched with any other queries submitted at the same time.
+
+        Args:
+            text: Query text
+
+        Returns:
+            Embedding for the text
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _next_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        """Wait for a request, then collect more until the batch is full or the window closes."""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        """Embed batches of queued requests and resolve their futures."""
+        while True:
+            batch = await self._next_batch()
+            try:
+                embeddings = await self.inner.aembed_documents([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
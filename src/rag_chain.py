@@ -1,19 +1,113 @@
 """RAG chain implementation for question answering."""
-import os
-from typing import Dict, Any, Optional
-from dotenv import load_dotenv
+import re
+import asyncio
+import logging
+import json
+import hashlib
+import threading
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+
+import redis
+from redisvl.exceptions import RedisVLError
+from redisvl.extensions.cache.llm import SemanticCache
+from redisvl.query.filter import Tag
+from redisvl.utils.vectorize import CustomTextVectorizer
 
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
-from langchain.memory import ConversationBufferWindowMemory
-from langchain.chains import ConversationalRetrievalChain
+from langchain.memory import ConversationSummaryBufferMemory
+from langchain.schema import Document
 
+from src.analytics import get_analytics
+from src.config import get_settings
+from src.data_loader import get_transaction_metadata, normalize_question
+from src.semantic_cache import LocalSemanticCache
 from src.vector_store import VectorStoreManager
 
-# Load environment variables
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Response cache settings
+RESPONSE_CACHE_PREFIX = "rag:v2:"
+RESPONSE_CACHE_TTL = 3600  # seconds
+SEMANTIC_CACHE_NAME = "rag_semantic_cache_v2"
+SEMANTIC_CACHE_DISTANCE_THRESHOLD = 0.03  # cosine distance, i.e. similarity >= 0.97
+
+# Errors from Redis or redisvl, treated as cache misses
+CACHE_ERRORS = (redis.RedisError, RedisVLError)
+
+# Seconds to wait on Redis before treating a lookup or write as failed
+REDIS_TIMEOUTS = {"socket_connect_timeout": 0.5, "socket_timeout": 0.5}
+
+# Conversation memory settings
+# Every buffered turn is sent with each question; older turns beyond this are folded
+# into a running summary (an extra Gemini call), so nothing falls between the two.
+# Sized for a few transaction-listing answers to bound the prompt
+MEMORY_MAX_TOKENS = 2000
+CHARS_PER_TOKEN = 4  # rough estimate used to size the memory buffer
+
+# Candidates fetched for MMR re-ranking when no metadata filter applies
+MMR_FETCH_K = 20
+
+# QA prompt, compiled once at import and shared by all chatbot instances.
+# Static instructions and data come first and per-turn text (summary, history
+# messages, question) last, so consecutive requests share the longest possible
+# prefix for Gemini's prompt caching. Recent turns are sent as chat messages.
+QA_SYSTEM_TEMPLATE = """You are an intelligent transaction assistant with access to all transaction data.
+
+Think step-by-step:
+1. Check if this is a follow-up question referring to previous conversation
+2. What is the user asking for? (specific customer, comparison, total, analysis, etc.)
+3. Which transactions are relevant to answer this question?
+4. What level of detail does the user want? (concise summary vs detailed breakdown)
+
+Response Guidelines:
+- If this is a follow-up question, use context from previous conversation
+- For simple "total" or "how much" questions: Provide a concise answer with just the final number
+- For "show me" or "list" questions: Provide detailed breakdown
+- For "all customers" with "list each": Show complete breakdown by customer
+- For comparisons or rankings: Show relevant comparisons
+- Always be accurate and use all relevant data
+- Use Indian Rupee format: Rs.X,XXX or ₹X,XXX
+
+Available Transaction Data:
+{context}
+{summary}"""
+
+QA_QUESTION_TEMPLATE = """Current Question: {question}
+
+Answer the question appropriately:"""
+
+QA_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", QA_SYSTEM_TEMPLATE),
+    MessagesPlaceholder(variable_name="history"),
+    ("human", QA_QUESTION_TEMPLATE),
+])
+
+
+def _format_docs(docs: List[Document]) -> str:
+    """Join retrieved documents into a single context string."""
+    return "\n\n".join(doc.page_content for doc in docs)
+
+
+def _vocabulary_pattern(values: List[str]) -> "re.Pattern[str]":
+    """Compile a case-insensitive whole-word pattern matching any of the given values."""
+    alternatives = sorted({re.escape(value) for value in values}, key=len, reverse=True)
+    return re.compile(r"\b(" + "|".join(alternatives) + r")\b", re.IGNORECASE)
+
+
+class GeminiChat(ChatGoogleGenerativeAI):
+    """
+    Gemini chat model with a local token estimate.
+    
+    The base implementation counts tokens with a GPT-2 tokenizer from transformers,
+    which is not a dependency; an estimate is enough for sizing conversation memory.
+    """
+    
+    def get_num_tokens(self, text: str) -> int:
+        return len(text) // CHARS_PER_TOKEN + 1
 
 
 class RAGChatbot:
@@ -23,114 +117,452 @@ class RAGChatbot:
         self,
         vector_store_manager: Optional[VectorStoreManager] = None,
         llm_model: Optional[str] = None,
-        temperature: float = 0,
-        top_k: int = 3
+        temperature: Optional[float] = None,
+        top_k: Optional[int] = None
     ):
         """
-        Initialize the RAG chatbot.
+        Initialize the RAG chatbot. Arguments that are not given come from the settings.
         
         Args:
             vector_store_manager: VectorStoreManager instance
-            llm_model: OpenAI model name
+            llm_model: Gemini model name
             temperature: LLM temperature (0 = deterministic)
             top_k: Number of documents to retrieve
         """
-        self.llm_model = llm_model or os.getenv("LLM_MODEL", "gemini-1.5-flash")
-        print(f'llm_model : {self.llm_model}')
-        self.temperature = float(os.getenv("TEMPERATURE", temperature))
-        print(f'temperature : {self.temperature}')
-        self.top_k = int(os.getenv("TOP_K_RESULTS", 50))  # Maximum retrieval for comprehensive queries
-        print(f'top_k : {self.top_k}')
+        settings = get_settings()
+        self.llm_model = llm_model or settings.llm_model
+        logger.debug("llm_model: %s", self.llm_model)
+        self.temperature = settings.temperature if temperature is None else temperature
+        logger.debug("temperature: %s", self.temperature)
+        self.top_k = settings.top_k if top_k is None else top_k
+        logger.debug("top_k: %s", self.top_k)
         
         # Initialize vector store manager
         if vector_store_manager is None:
             from src.vector_store import setup_vector_store
-            self.vector_store_manager = setup_vector_store(force_recreate=True)
+            self.vector_store_manager = setup_vector_store()
         else:
             self.vector_store_manager = vector_store_manager
         
         # Initialize Google Gemini LLM
-        self.llm = ChatGoogleGenerativeAI(
+        self.llm = GeminiChat(
             model=self.llm_model,
             temperature=self.temperature,
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
+            google_api_key=settings.google_api_key,
+            # This Gemini integration has no system role; the static system prompt is
+            # merged into the first user message, keeping it at the front of the prompt
             convert_system_message_to_human=True
         )
-        print(f'LLM : {self.llm}')
-        
-        # Get retriever
-        self.retriever = self.vector_store_manager.get_retriever(top_k=self.top_k)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("LLM: %r", self.llm)
         
-        # Initialize LangChain memory
-        self.memory = ConversationBufferWindowMemory(
-            k=10,
+        # Initialize LangChain memory: recent turns verbatim, older ones summarized
+        self.memory = ConversationSummaryBufferMemory(
+            llm=self.llm,
+            max_token_limit=MEMORY_MAX_TOKENS,
             memory_key="chat_history",
             return_messages=True,
             output_key="answer"
         )
         
-        # Create conversational retrieval chain
-        self.chain = ConversationalRetrievalChain.from_llm(
-            llm=self.llm,
-            retriever=self.retriever,
-            memory=self.memory,
-            return_source_documents=True,
-            combine_docs_chain_kwargs={"prompt": self._get_qa_prompt()}
+        # Prompt-ready summary and history window, rebuilt whenever memory changes
+        self._summary_text = ""
+        self._history_window: List[BaseMessage] = []
+        
+        # Create the QA chain: a single LCEL runnable (one Gemini call per turn) that
+        # takes {"question", "docs", "summary", "history"}, fills in the context and
+        # returns the answer
+        self.chain = (
+            RunnablePassthrough.assign(
+                context=lambda inputs: self._format_context(inputs["docs"])
+            )
+            | self._get_qa_prompt()
+            | self.llm
+            | StrOutputParser()
+        )
+        logger.debug("RAG Chain created successfully")
+        
+        # Full-corpus context string, built lazily from the vector store's documents
+        self._full_context = ""
+        self._full_context_docs: Optional[List[Document]] = None
+        
+        # Build customer/product vocabularies for metadata-filtered retrieval
+        metadata = get_transaction_metadata()
+        self._customers = {m["customer"].lower(): m["customer"] for m in metadata}
+        self._products = {m["product"].lower(): m["product"] for m in metadata}
+        self._customer_pattern = _vocabulary_pattern(list(self._customers.values()))
+        self._product_pattern = _vocabulary_pattern(list(self._products.values()))
+        
+        # Initialize Redis response caches (disabled when REDIS_URL is not set)
+        # The Redis client connects lazily; the semantic cache (which connects and creates
+        # its index) is built on first use, so an unreachable Redis is just a cache miss.
+        # Short timeouts bound how long an unresponsive Redis can hold up a query
+        self.redis_url = settings.redis_url
+        self.response_cache = None
+        self._semantic_cache: Optional[SemanticCache] = None
+        self._semantic_cache_lock = threading.Lock()
+        if self.redis_url:
+            self.response_cache = redis.Redis.from_url(
+                self.redis_url, decode_responses=True, **REDIS_TIMEOUTS
+            )
+        
+        # In-process semantic cache, consulted before Redis
+        self.local_cache = LocalSemanticCache(
+            threshold=1 - SEMANTIC_CACHE_DISTANCE_THRESHOLD,
+            ttl=RESPONSE_CACHE_TTL
         )
-        print(f'Conversational RAG Chain created successfully')
     
 
     
 
     
     def _get_qa_prompt(self) -> ChatPromptTemplate:
-        """Get the QA prompt template for the retrieval chain."""
-        template = """You are a transaction assistant. Use ALL transaction data in the context to answer questions accurately.
+        """Get the QA prompt template that guides the LLM to use appropriate level of detail."""
+        return QA_PROMPT
 
-Transaction Context:
-{context}
+    def _cache_scope(self, question: str) -> str:
+        """
+        Build the cache scope for a question: the ingested corpus and the customer/product
+        it names. Similar questions about different customers embed close together, so a
+        semantic hit must also match the scope, and re-ingesting invalidates old answers.
+        """
+        raw = json.dumps([self.vector_store_manager.get_corpus_hash(), *self._named_entities(question)])
+        return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
 
-User Question: {question}
+    def _cache_key(self, question: str, use_memory: bool, scope: str) -> str:
+        """Build the response cache key for a question."""
+        raw = f"{normalize_question(question)}|{int(use_memory)}|{self.top_k}|{scope}"
+        return RESPONSE_CACHE_PREFIX + hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
 
-IMPORTANT RULES:
-- For "all customers" or "total spending" queries: You MUST include EVERY customer and EVERY transaction found in the context above
-- For individual customer queries: Find ALL transactions for that specific customer
-- Always list every transaction found in the context - do not skip any
-- Show complete calculations with customer names, products, amounts, and dates
-- Group transactions by customer when showing totals
-- Format amounts in Indian Rupees (Rs.) with proper formatting
-- If the context contains multiple transactions, list them ALL in your answer
+    def _query_embedding(self, question: str) -> List[float]:
+        """Embed the question for semantic cache lookups and retrieval."""
+        return self.vector_store_manager.embeddings.embed_query(question)
 
-ANSWER FORMAT FOR "ALL CUSTOMERS" QUERIES:
-1. List each customer with their transactions
-2. Show the total for each customer
-3. Calculate and show the grand total at the end
+    async def _aquery_embedding(self, question: str) -> List[float]:
+        """Async version of _query_embedding, batched with concurrent requests."""
+        return await self.vector_store_manager.embeddings.aembed_query(question)
 
-Example for comprehensive queries:
-"Here are all the transactions:
+    def _get_semantic_cache(self) -> SemanticCache:
+        """
+        Get the Redis semantic cache, connecting and creating its index on first use.
+        
+        Raises:
+            RedisVLError: If the vectorizer's test embedding fails
+        """
+        with self._semantic_cache_lock:
+            if self._semantic_cache is None:
+                try:
+                    vectorizer = CustomTextVectorizer(
+                        embed=self.vector_store_manager.embeddings.embed_query
+                    )
+                except ValueError as e:
+                    raise RedisVLError(f"Semantic cache vectorizer setup failed: {e}") from e
+                
+                self._semantic_cache = SemanticCache(
+                    name=SEMANTIC_CACHE_NAME,
+                    redis_url=self.redis_url,
+                    connection_kwargs=REDIS_TIMEOUTS,
+                    ttl=RESPONSE_CACHE_TTL,
+                    distance_threshold=SEMANTIC_CACHE_DISTANCE_THRESHOLD,
+                    filterable_fields=[{"name": "scope", "type": "tag"}],
+                    vectorizer=vectorizer
+                )
+            return self._semantic_cache
 
-Amit:
-- 2024-01-12: Laptop - Rs.55,000
-- 2024-02-15: Mouse - Rs.700
-Total for Amit: Rs.55,700
+    def _get_cached_response(
+        self,
+        question: str,
+        use_memory: bool,
+        embedding: List[float]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached answer: in process by semantic similarity, then in Redis
+        by exact key and by semantic similarity. Semantic hits must share the
+        question's scope. Redis errors are treated as a miss.
+        """
+        scope = self._cache_scope(question)
+        cached = self.local_cache.get(embedding, scope)
+        if cached is not None:
+            return cached
+        if self.response_cache is None:
+            return None
+        
+        try:
+            cached = self.response_cache.get(self._cache_key(question, use_memory, scope))
+            if cached:
+                return json.loads(cached)
+            
+            hits = self._get_semantic_cache().check(
+                vector=embedding,
+                num_results=1,
+                filter_expression=Tag("scope") == scope
+            )
+            if hits:
+                return {
+                    "answer": hits[0]["response"],
+                    "sources": (hits[0].get("metadata") or {}).get("sources", [])
+                }
+        except CACHE_ERRORS as e:
+            logger.warning("Response cache lookup failed: %s", e)
+        return None
 
-[... continue for ALL customers in context ...]
+    def _set_cached_response(
+        self,
+        question: str,
+        use_memory: bool,
+        embedding: List[float],
+        answer: str,
+        docs: List[Document],
+        sources: list
+    ) -> None:
+        """Store an answer in the in-process cache and the Redis response caches."""
+        scope = self._cache_scope(question)
+        self.local_cache.put(
+            embedding,
+            {"answer": answer, "source_documents": docs, "sources": sources},
+            scope
+        )
+        if self.response_cache is None:
+            return
+        
+        try:
+            self.response_cache.setex(
+                self._cache_key(question, use_memory, scope),
+                RESPONSE_CACHE_TTL,
+                json.dumps({"answer": answer, "sources": sources})
+            )
+            self._get_semantic_cache().store(
+                prompt=normalize_question(question),
+                response=answer,
+                vector=embedding,
+                metadata={"sources": sources},
+                filters={"scope": scope}
+            )
+        except CACHE_ERRORS as e:
+            logger.warning("Response cache write failed: %s", e)
 
-Grand Total: Rs.[sum of all]"
+    def _save_turn(self, question: str, answer: str, use_memory: bool) -> None:
+        """Record a turn in conversation memory, unless memory is off for this query."""
+        if use_memory:
+            self.memory.save_context(
+                {"question": question},
+                {"answer": answer}
+            )
+            self._refresh_history()
+
+    async def _asave_turn(self, question: str, answer: str, use_memory: bool) -> None:
+        """
+        Async version of _save_turn. Saving can call Gemini to fold old turns into
+        the summary, so it runs in a worker thread instead of blocking the event loop.
+        """
+        if use_memory:
+            await self.memory.asave_context(
+                {"question": question},
+                {"answer": answer}
+            )
+            self._refresh_history()
 
-Answer:"""
+    def _try_structured(self, question: str) -> Optional[Dict[str, Any]]:
+        """
+        Answer common aggregation questions (customer totals, most purchased product,
+        monthly sales) directly from precomputed aggregates, bypassing the LLM.
+        Any failure building or using the aggregates (e.g. malformed data) is
+        logged and the question falls through to RAG.
+        """
+        try:
+            structured = get_analytics().answer(question)
+        except Exception as e:
+            logger.warning("Structured answer failed, falling back to RAG: %s", e, exc_info=e)
+            return None
+        if structured is None:
+            return None
         
-        return ChatPromptTemplate.from_template(template)
+        answer, sources = structured
+        return {
+            "answer": answer,
+            "source_documents": [],
+            "sources": sources
+        }
+
+    def _named_entities(self, question: str) -> Tuple[List[str], List[str]]:
+        """Get the customers and products named in the question, sorted."""
+        customers = {self._customers[m.lower()] for m in self._customer_pattern.findall(question)}
+        products = {self._products[m.lower()] for m in self._product_pattern.findall(question)}
+        return sorted(customers), sorted(products)
 
+    def _metadata_conditions(self, question: str) -> List[Dict[str, str]]:
+        """
+        Get the metadata condition for retrieval when the question names exactly one
+        customer or exactly one product. A customer and a product are not combined,
+        since questions like "did anyone other than Amit buy a Laptop" need both sides.
+        """
+        customers, products = self._named_entities(question)
+        if len(customers) == 1 and not products:
+            return [{"customer": customers[0]}]
+        if len(products) == 1 and not customers:
+            return [{"product": products[0]}]
+        return []
 
+    def _retrieve_from_corpus(self) -> Optional[List[Document]]:
+        """
+        When the whole corpus fits in top_k, skip the vector store (and the query
+        embedding) and return every document, unfiltered: comparison questions that
+        name a customer ("is Amit the biggest spender?") need everyone's rows.
+        Returns None when the corpus is too large and real retrieval is needed.
+        """
+        all_docs = self.vector_store_manager.get_all_documents()
+        if len(all_docs) > self.top_k:
+            return None
+        return all_docs
 
-    def query(self, question: str) -> Dict[str, Any]:
+    def _format_context(self, docs: List[Document]) -> str:
+        """Format documents as prompt context, reusing the cached string for the full corpus."""
+        if docs is not self.vector_store_manager.get_all_documents():
+            return _format_docs(docs)
+        if docs is not self._full_context_docs:
+            self._full_context = _format_docs(docs)
+            self._full_context_docs = docs
+        return self._full_context
+
+    def _search(self, embedding: List[float], conditions: List[Dict[str, str]]) -> List[Document]:
+        """
+        Search the in-memory embedding matrix: filtered by the conditions when the question
+        names a customer or product, otherwise MMR to avoid redundant documents.
+        """
+        manager = self.vector_store_manager
+        if conditions:
+            return [doc for doc, _ in manager.fast_search(embedding, self.top_k, conditions)]
+        return manager.fast_mmr_search(embedding, self.top_k, fetch_k=max(MMR_FETCH_K, self.top_k))
+
+    def _retrieve(self, question: str, embedding: Optional[List[float]] = None) -> List[Document]:
+        """
+        Retrieve context documents: the cached corpus when it fits in top_k, otherwise
+        a search by the question's embedding, reusing the one already computed for the
+        cache lookup if given.
+        """
+        corpus_docs = self._retrieve_from_corpus()
+        if corpus_docs is not None:
+            return corpus_docs
+        
+        if embedding is None:
+            embedding = self._query_embedding(question)
+        return self._search(embedding, self._metadata_conditions(question))
+
+    async def _aretrieve(
+        self,
+        question: str,
+        embedding: Optional[List[float]] = None
+    ) -> List[Document]:
+        """Async version of _retrieve; the question is embedded in a batch with concurrent requests."""
+        corpus_docs = self._retrieve_from_corpus()
+        if corpus_docs is not None:
+            return corpus_docs
+        
+        if embedding is None:
+            embedding = await self._aquery_embedding(question)
+        return self._search(embedding, self._metadata_conditions(question))
+
+    def _use_cache(self, use_memory: bool) -> bool:
+        """Whether the response caches apply; earlier turns can change a follow-up's answer."""
+        return not (use_memory and self._has_history())
+
+    def _has_history(self) -> bool:
+        """Whether memory holds any earlier turns, verbatim or summarized."""
+        return bool(self.memory.chat_memory.messages or self.memory.moving_summary_buffer)
+
+    def _cached_result(
+        self,
+        question: str,
+        use_memory: bool,
+        embedding: List[float]
+    ) -> Optional[Dict[str, Any]]:
+        """Return a cached result for the question, if any."""
+        cached = self._get_cached_response(question, use_memory, embedding)
+        if cached is None:
+            return None
+        
+        return {
+            "answer": cached["answer"],
+            "source_documents": cached.get("source_documents", []),
+            "sources": cached["sources"]
+        }
+
+    def _refresh_history(self) -> None:
+        """
+        Rebuild the prompt's summary text and message window from memory: every
+        buffered message, with older turns covered by the summary.
+        Done once per saved turn, so building a prompt does no history formatting.
+        The window starts at a user message, as Gemini needs turns to alternate
+        from the user; an answer left at the front of the buffer by pruning goes
+        with the summary instead.
+        """
+        messages = self.memory.chat_memory.messages
+        start = next((i for i, msg in enumerate(messages) if isinstance(msg, HumanMessage)), len(messages))
+        self._history_window = messages[start:]
+        
+        summary = self.memory.moving_summary_buffer
+        leading = " ".join(msg.content for msg in messages[:start])
+        self._summary_text = (
+            (f"\nSummary of earlier conversation: {summary}\n" if summary else "")
+            + (f"\nLast earlier answer: {leading}\n" if leading else "")
+        )
+
+    def _chain_inputs(self, question: str, docs: List[Document], use_memory: bool) -> Dict[str, Any]:
+        """Build the QA chain inputs; without memory the prompt gets no summary or history."""
+        return {
+            "question": question,
+            "docs": docs,
+            "summary": self._summary_text if use_memory else "",
+            "history": self._history_window if use_memory else []
+        }
+
+    def _build_result(
+        self,
+        question: str,
+        answer: str,
+        docs: List[Document],
+        use_memory: bool,
+        cache_embedding: Optional[List[float]]
+    ) -> Dict[str, Any]:
+        """
+        Save the answer to the caches under the question's embedding if given,
+        and build the query result.
+        """
+        sources = [doc.metadata for doc in docs]
+        if cache_embedding is not None:
+            self._set_cached_response(question, use_memory, cache_embedding, answer, docs, sources)
+        
+        return {
+            "answer": answer,
+            "source_documents": docs,
+            "sources": sources
+        }
+
+    @staticmethod
+    def _error_result(error: Exception) -> Dict[str, Any]:
+        """Log a failed query and build the fallback result."""
+        logger.error("Query failed: %s", error, exc_info=error)
+        return {
+            "answer": "I'm sorry, I encountered an error processing your question. Please try again.",
+            "source_documents": [],
+            "sources": []
+        }
+
+    def query(self, question: str, use_memory: bool = True) -> Dict[str, Any]:
         """
         Answer a question using RAG with intelligent, dynamic retrieval and conversation memory.
-        The system automatically retrieves all documents and lets the LLM decide what to use.
+        When the corpus fits in top_k, every transaction is sent as context. Otherwise
+        retrieval is narrowed to a customer or product when the question names just one,
+        and MMR picks a diverse set of transactions for the rest.
+        Simple aggregation questions are answered from precomputed totals without the LLM.
+        
+        Answers are cached in process and in Redis (when configured), matched semantically
+        on the question's embedding or exactly on the normalized question. The caches are
+        bypassed for follow-up turns, since their answer depends on history.
         
         Args:
             question: User's question
+            use_memory: Whether to read and update conversation memory
             
         Returns:
             Dictionary containing:
@@ -138,82 +570,56 @@ Answer:"""
                 - source_documents: Retrieved documents used as context
         """
         try:
-            # Always retrieve ALL transactions and let the LLM intelligently use what it needs
-            # This removes the need for static keyword matching
-            all_docs = self.vector_store_manager.vectorstore.similarity_search(
-                question, 
-                k=14  # Retrieve all 14 transactions - let LLM decide what's relevant
-            )
-            
-            # Create context from all documents
-            context = "\n\n".join([doc.page_content for doc in all_docs])
+            result = self._try_structured(question)
+            embedding = None
+            if result is None and self._use_cache(use_memory):
+                embedding = self._query_embedding(question)
+                result = self._cached_result(question, use_memory, embedding)
             
-            # Get conversation history
-            chat_history = self.memory.load_memory_variables({}).get("chat_history", [])
+            if result is None:
+                all_docs = self._retrieve(question, embedding)
+                
+                answer = self.chain.invoke(self._chain_inputs(question, all_docs, use_memory))
+                result = self._build_result(question, answer, all_docs, use_memory, embedding)
             
-            # Format chat history for the prompt
-            history_text = ""
-            if chat_history:
-                history_text = "\n\nPrevious Conversation:\n"
-                for msg in chat_history[-6:]:  # Last 3 exchanges (6 messages)
-                    role = "User" if msg.type == "human" else "Assistant"
-                    history_text += f"{role}: {msg.content}\n"
+            self._save_turn(question, result["answer"], use_memory)
+            return result
             
-            # Use enhanced prompt that guides the LLM to use appropriate level of detail
-            prompt = ChatPromptTemplate.from_template(
-                """You are an intelligent transaction assistant with access to all transaction data.
-{history}
-Available Transaction Data:
-{context}
-
-Current Question: {question}
-
-Think step-by-step:
-1. Check if this is a follow-up question referring to previous conversation
-2. What is the user asking for? (specific customer, comparison, total, analysis, etc.)
-3. Which transactions are relevant to answer this question?
-4. What level of detail does the user want? (concise summary vs detailed breakdown)
-
-Response Guidelines:
-- If this is a follow-up question, use context from previous conversation
-- For simple "total" or "how much" questions: Provide a concise answer with just the final number
-- For "show me" or "list" questions: Provide detailed breakdown
-- For "all customers" with "list each": Show complete breakdown by customer
-- For comparisons or rankings: Show relevant comparisons
-- Always be accurate and use all relevant data
-- Use Indian Rupee format: Rs.X,XXX or ₹X,XXX
+        except Exception as e:
+            return self._error_result(e)
 
-Answer the question appropriately:"""
-            )
+    async def aquery(self, question: str, use_memory: bool = True) -> Dict[str, Any]:
+        """
+        Async version of query: retrieval and the Gemini call yield to the event loop,
+        and the blocking Redis cache calls run in a worker thread.
+        
+        Args:
+            question: User's question
+            use_memory: Whether to read and update conversation memory
             
-            chain = prompt | self.llm | StrOutputParser()
-            answer = chain.invoke({
-                "context": context, 
-                "question": question,
-                "history": history_text
-            })
+        Returns:
+            Dictionary with answer, source documents and sources
+        """
+        try:
+            result = self._try_structured(question)
+            embedding = None
+            if result is None and self._use_cache(use_memory):
+                embedding = await self._aquery_embedding(question)
+                result = await asyncio.to_thread(self._cached_result, question, use_memory, embedding)
             
-            # Save to memory
-            self.memory.save_context(
-                {"question": question},
-                {"answer": answer}
-            )
+            if result is None:
+                all_docs = await self._aretrieve(question, embedding)
+                
+                answer = await self.chain.ainvoke(self._chain_inputs(question, all_docs, use_memory))
+                result = await asyncio.to_thread(
+                    self._build_result, question, answer, all_docs, use_memory, embedding
+                )
             
-            return {
-                "answer": answer,
-                "source_documents": all_docs,
-                "sources": [doc.metadata for doc in all_docs]
-            }
+            await self._asave_turn(question, result["answer"], use_memory)
+            return result
             
         except Exception as e:
-            print(f"[ERROR] Query failed: {e}")
-            import traceback
-            traceback.print_exc()
-            return {
-                "answer": "I'm sorry, I encountered an error processing your question. Please try again.",
-                "source_documents": [],
-                "sources": []
-            }
+            return self._error_result(e)
     
     def chat(self, question: str, use_memory: bool = True) -> Dict[str, Any]:
         """
@@ -226,29 +632,70 @@ Answer the question appropriately:"""
         Returns:
             Dictionary with answer and sources
         """
-        if use_memory:
-            return self.query(question)
-        else:
-            # Clear memory temporarily for this query
-            temp_memory = self.memory.chat_memory.messages.copy()
-            self.memory.clear()
-            result = self.query(question)
-            # Restore memory
-            self.memory.chat_memory.messages = temp_memory
-            return result
-    
+        return self.query(question, use_memory=use_memory)
+
+    async def achat(self, question: str, use_memory: bool = True) -> Dict[str, Any]:
+        """
+        Async version of chat.
+        
+        Args:
+            question: User's question
+            use_memory: Whether to use conversation memory
+            
+        Returns:
+            Dictionary with answer and sources
+        """
+        return await self.aquery(question, use_memory=use_memory)
+
+    async def astream(self, question: str, use_memory: bool = True) -> AsyncIterator[str]:
+        """
+        Stream the answer to a question as it is generated.
+        
+        Structured and cached answers are yielded as a single chunk. The completed
+        answer is saved to memory and the caches once the stream finishes.
+        
+        Args:
+            question: User's question
+            use_memory: Whether to use conversation memory
+            
+        Yields:
+            Answer text chunks
+        """
+        try:
+            result = self._try_structured(question)
+            embedding = None
+            if result is None and self._use_cache(use_memory):
+                embedding = await self._aquery_embedding(question)
+                result = await asyncio.to_thread(self._cached_result, question, use_memory, embedding)
+            if result is not None:
+                yield result["answer"]
+                await self._asave_turn(question, result["answer"], use_memory)
+                return
+            
+            all_docs = await self._aretrieve(question, embedding)
+            
+            chunks = []
+            async for chunk in self.chain.astream(self._chain_inputs(question, all_docs, use_memory)):
+                chunks.append(chunk)
+                yield chunk
+            answer = "".join(chunks)
+            await asyncio.to_thread(self._build_result, question, answer, all_docs, use_memory, embedding)
+            await self._asave_turn(question, answer, use_memory)
+            
+        except Exception as e:
+            yield self._error_result(e)["answer"]
+
     def get_last_question(self) -> Optional[str]:
         """Get the last question from memory."""
-        messages = self.memory.chat_memory.messages
-        if messages:
-            for msg in reversed(messages):
-                if hasattr(msg, 'type') and msg.type == 'human':
-                    return msg.content
-        return None
+        return next(
+            (msg.content for msg in reversed(self.memory.chat_memory.messages) if isinstance(msg, HumanMessage)),
+            None
+        )
     
     def clear_memory(self):
         """Clear conversation history."""
         self.memory.clear()
+        self._refresh_history()
 
 
 def main():
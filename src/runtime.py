@@ -0,0 +1,27 @@
+"""Process-wide shared instances of the vector store and chatbot."""
+from functools import lru_cache
+
+from src.rag_chain import RAGChatbot
+from src.vector_store import VectorStoreManager, setup_vector_store
+
+
+@lru_cache(maxsize=1)
+def get_vector_store() -> VectorStoreManager:
+    """
+    Get the shared vector store manager, building it on first use.
+    
+    Returns:
+        Initialized VectorStoreManager (one Chroma client per process)
+    """
+    return setup_vector_store()
+
+
+@lru_cache(maxsize=1)
+def get_chatbot() -> RAGChatbot:
+    """
+    Get the shared chatbot, building it on first use.
+    
+    Returns:
+        RAGChatbot backed by the shared vector store manager
+    """
+    return RAGChatbot(vector_store_manager=get_vector_store())
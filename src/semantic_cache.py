@@ -0,0 +1,117 @@
+"""In-process semantic cache for chatbot answers."""
+import time
+import threading
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+
+
+class LocalSemanticCache:
+    """
+    LRU cache of answers keyed on query embeddings, matched by cosine similarity.
+
+    Each entry also has a scope (e.g. the customer/product a question names), and
+    a hit requires the same scope, since near-identical questions about different
+    customers must not share an answer.
+
+    Embeddings are kept as rows of a preallocated float32 matrix (with parallel
+    scope-id, timestamp and last-used arrays), so a lookup is a single
+    matrix-vector product.
+    """
+
+    def __init__(self, threshold: float = 0.97, max_size: int = 256, ttl: float = 3600):
+        """
+        Initialize the cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a cache hit
+            max_size: Maximum number of cached answers before LRU eviction
+            ttl: Seconds a cached answer stays valid
+        """
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._lock = threading.RLock()
+        self._embeddings: Optional[np.ndarray] = None  # (max_size, dim), allocated on first put
+        self._scope_ids: Dict[Hashable, int] = {}
+        self._scopes = np.zeros(max_size, dtype=np.int64)
+        self._created = np.zeros(max_size, dtype=np.float64)
+        self._last_used = np.zeros(max_size, dtype=np.int64)
+        self._values: List[Any] = [None] * max_size
+        self._size = 0
+        self._clock = 0
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        """L2-normalize an embedding so dot products are cosine similarities."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def get(self, embedding: List[float], scope: Hashable = None) -> Optional[Any]:
+        """
+        Look up the answer cached for the most similar, unexpired query in the same scope.
+
+        Args:
+            embedding: Query embedding
+            scope: Scope the cached entry must have been stored under
+
+        Returns:
+            Cached value, or None on a miss
+        """
+        query = self._normalize(embedding)
+        with self._lock:
+            scope_id = self._scope_ids.get(scope)
+            if self._size == 0 or scope_id is None:
+                return None
+
+            similarities = self._embeddings[:self._size] @ query
+            expired = time.monotonic() - self._created[:self._size] > self.ttl
+            similarities[expired | (self._scopes[:self._size] != scope_id)] = -np.inf
+
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+
+            self._last_used[best] = self._tick()
+            return self._values[best]
+
+    def put(self, embedding: List[float], value: Any, scope: Hashable = None) -> None:
+        """
+        Cache a value for a query embedding, evicting an expired or the least
+        recently used entry when the cache is full.
+
+        Args:
+            embedding: Query embedding
+            value: Value to cache
+            scope: Scope a later lookup must match
+        """
+        vector = self._normalize(embedding)
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+
+            if self._size < self.max_size:
+                slot = self._size
+                self._size += 1
+            else:
+                expired = np.flatnonzero(time.monotonic() - self._created > self.ttl)
+                slot = int(expired[0]) if expired.size else int(np.argmin(self._last_used))
+
+            self._embeddings[slot] = vector
+            self._scopes[slot] = self._scope_ids.setdefault(scope, len(self._scope_ids))
+            self._created[slot] = time.monotonic()
+            self._last_used[slot] = self._tick()
+            self._values[slot] = value
+
+    def clear(self) -> None:
+        """Remove all cached values."""
+        with self._lock:
+            self._values = [None] * self.max_size
+            self._scope_ids = {}
+            self._size = 0
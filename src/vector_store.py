@@ -1,17 +1,112 @@
 """Vector store management using LangChain and ChromaDB."""
-import os
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Optional
-from dotenv import load_dotenv
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 from langchain_community.vectorstores import Chroma
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain.embeddings import CacheBackedEmbeddings
 from langchain.schema import Document
+from langchain.storage import LocalFileStore
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+from langchain_core.embeddings import Embeddings
 
-from src.data_loader import get_all_transaction_texts, get_transaction_metadata
+from src.config import get_settings
+from src.data_loader import get_all_transaction_texts, get_transaction_metadata, normalize_question
+from src.embedder import BatchingEmbedder
 
-# Load environment variables
-load_dotenv()
+# Number of texts sent per embedding request when building the index
+EMBED_BATCH_SIZE = 100
+
+# Query embeddings kept in memory, keyed on normalized query text
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+
+# HNSW index parameters for new collections. Chroma's defaults (M=16,
+# construction_ef=100) are sized for large corpora; a small one needs a much
+# sparser graph. Larger corpora keep the defaults.
+SMALL_CORPUS_SIZE = 1000
+SMALL_CORPUS_HNSW_M = 4
+SMALL_CORPUS_HNSW_CONSTRUCTION_EF = 16
+SMALL_CORPUS_HNSW_SEARCH_EF = 16
+
+# Collection metadata key holding the hash of the ingested transaction texts
+CORPUS_HASH_KEY = "corpus_hash"
+
+# Metadata keys that retrieval filters on, encoded as integer arrays when the index loads
+FILTER_KEYS = ("customer", "product")
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings with a persistent on-disk cache for both documents and queries.
+    
+    CacheBackedEmbeddings only caches documents, so queries get their own embedder
+    (Gemini embeds queries and documents with different task types) and namespace.
+    Query embeddings are also kept in an in-process LRU keyed on normalized text,
+    shared by the sync path and the async batched path.
+    """
+    
+    def __init__(
+        self,
+        document_embeddings: Embeddings,
+        query_embeddings: Embeddings,
+        cache_directory: str,
+        namespace: str
+    ):
+        store = LocalFileStore(cache_directory)
+        self.documents = CacheBackedEmbeddings.from_bytes_store(
+            document_embeddings, store, namespace=f"{namespace}.document"
+        )
+        self.queries = CacheBackedEmbeddings.from_bytes_store(
+            query_embeddings, store, namespace=f"{namespace}.query"
+        )
+        # Coalesces concurrent async query embeddings into batched API calls
+        self.query_batcher = BatchingEmbedder(self.queries)
+        
+        # In-process LRU in front of the on-disk query cache
+        self._query_lock = threading.Lock()
+        self._query_lru: "OrderedDict[str, Tuple[float, ...]]" = OrderedDict()
+    
+    def _lookup_query(self, key: str) -> Optional[List[float]]:
+        """Get a query embedding from the LRU, marking it recently used."""
+        with self._query_lock:
+            embedding = self._query_lru.get(key)
+            if embedding is None:
+                return None
+            self._query_lru.move_to_end(key)
+            return list(embedding)
+    
+    def _remember_query(self, key: str, embedding: List[float]) -> None:
+        """Add a query embedding to the LRU, evicting the least recently used one."""
+        with self._query_lock:
+            self._query_lru[key] = tuple(embedding)
+            self._query_lru.move_to_end(key)
+            if len(self._query_lru) > QUERY_EMBEDDING_CACHE_SIZE:
+                self._query_lru.popitem(last=False)
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.documents.embed_documents(texts)
+    
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_question(text)
+        embedding = self._lookup_query(key)
+        if embedding is None:
+            embedding = self.queries.embed_documents([key])[0]
+            self._remember_query(key, embedding)
+        return embedding
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        # LRU misses are batched with concurrent requests
+        key = normalize_question(text)
+        embedding = self._lookup_query(key)
+        if embedding is None:
+            embedding = await self.query_batcher.embed_query(key)
+            self._remember_query(key, embedding)
+        return embedding
 
 
 class VectorStoreManager:
@@ -31,9 +126,11 @@ class VectorStoreManager:
             collection_name: Name of the collection in ChromaDB
             embedding_model: OpenAI embedding model to use
         """
-        self.persist_directory = persist_directory or os.getenv("VECTOR_DB_PATH", "./chroma_db")
-        self.collection_name = collection_name or os.getenv("COLLECTION_NAME", "transactions")
-        self.embedding_model = embedding_model or os.getenv("EMBEDDING_MODEL", "models/gemini-embedding-001")
+        settings = get_settings()
+        self.persist_directory = persist_directory or settings.vector_db_path
+        self.collection_name = collection_name or settings.collection_name
+        self.embedding_model = embedding_model or settings.embedding_model
+        self.embedding_cache_directory = settings.embedding_cache_path
 
         print(f' VECTOR STORE ')
         print(f'persist_directory : {self.persist_directory}')
@@ -42,13 +139,26 @@ class VectorStoreManager:
         print(f' VECTOR STORE')
         # print(f'')
         
-        # Initialize embeddings using Google Gemini
-        self.embeddings = GoogleGenerativeAIEmbeddings(
-            model=self.embedding_model,
-            google_api_key=os.getenv("GOOGLE_API_KEY")
+        # Initialize embeddings using Google Gemini, cached on disk by exact text
+        self.embeddings = CachedEmbeddings(
+            GoogleGenerativeAIEmbeddings(
+                model=self.embedding_model,
+                google_api_key=settings.google_api_key
+            ),
+            GoogleGenerativeAIEmbeddings(
+                model=self.embedding_model,
+                google_api_key=settings.google_api_key,
+                task_type="retrieval_query"
+            ),
+            cache_directory=self.embedding_cache_directory,
+            namespace=self.embedding_model.replace("/", "_")
         )
         
         self.vectorstore: Optional[Chroma] = None
+        self._all_documents: Optional[List[Document]] = None
+        self._embedding_matrix: Optional[np.ndarray] = None  # L2-normalized rows, same order as _all_documents
+        # Per metadata key: code of each document's value (same order) and the code of each value
+        self._metadata_codes: Dict[str, Tuple[np.ndarray, Dict[Any, int]]] = {}
     
     def initialize_store(self, force_recreate: bool = False) -> Chroma:
         """
@@ -65,6 +175,8 @@ class VectorStoreManager:
         # Check if vector store already exists
         if persist_path.exists() and not force_recreate:
             print(f"Loading existing vector store from {self.persist_directory}")
+            # No collection metadata: Chroma would overwrite the existing collection's
+            # (including the corpus hash) with it
             self.vectorstore = Chroma(
                 persist_directory=self.persist_directory,
                 embedding_function=self.embeddings,
@@ -76,19 +188,35 @@ class VectorStoreManager:
             self.vectorstore = Chroma(
                 persist_directory=self.persist_directory,
                 embedding_function=self.embeddings,
-                collection_name=self.collection_name
+                collection_name=self.collection_name,
+                collection_metadata=self._collection_metadata()
             )
         
         return self.vectorstore
     
-    def ingest_transactions(self) -> None:
+    def _collection_metadata(self) -> Optional[Dict[str, Any]]:
         """
-        Ingest transaction data into the vector store.
-        Creates embeddings for all transactions and stores them.
+        Get the HNSW settings for a new collection, sized to the transaction count.
+        
+        The distance stays Chroma's default (l2): hnsw:space can't be passed to
+        modify(), so it would be dropped from the metadata when the corpus hash is
+        recorded, and Chroma's relevance scores would misread the index.
         """
-        if self.vectorstore is None:
-            self.initialize_store()
+        if len(get_transaction_metadata()) > SMALL_CORPUS_SIZE:
+            return None
+        return {
+            "hnsw:M": SMALL_CORPUS_HNSW_M,
+            "hnsw:construction_ef": SMALL_CORPUS_HNSW_CONSTRUCTION_EF,
+            "hnsw:search_ef": max(SMALL_CORPUS_HNSW_SEARCH_EF, get_settings().top_k * 2),
+        }
+    
+    def _build_documents(self) -> Tuple[List[Document], List[str]]:
+        """
+        Build Document objects and unique IDs for all transactions.
         
+        Returns:
+            Tuple of (documents, ids)
+        """
         # Get transaction texts and metadata
         transaction_texts = get_all_transaction_texts()
         transaction_metadata = get_transaction_metadata()
@@ -101,26 +229,291 @@ class VectorStoreManager:
             )
             for text, metadata in zip(transaction_texts, transaction_metadata)
         ]
+        ids = [f"txn_{metadata['id']}" for metadata in transaction_metadata]
         
-        print(f"Ingesting {len(documents)} transactions into vector store...")
+        return documents, ids
+    
+    def _corpus_hash(self, texts: List[str]) -> str:
+        """Hash the transaction texts and embedding model that the index is built from."""
+        return hashlib.sha256("\0".join([self.embedding_model, *texts]).encode()).hexdigest()
+    
+    def _stored_corpus_hash(self) -> Optional[str]:
+        """Get the corpus hash recorded on the collection at the last ingest, if any."""
+        return (self.vectorstore._collection.metadata or {}).get(CORPUS_HASH_KEY)
+    
+    def _is_up_to_date(self, corpus_hash: str, ids: List[str]) -> bool:
+        """Whether the persisted collection already holds exactly this corpus."""
+        return (
+            self._stored_corpus_hash() == corpus_hash
+            and self.vectorstore._collection.count() == len(ids)
+        )
+    
+    def _remove_stale_documents(self, ids: List[str]) -> None:
+        """Delete documents whose transactions are no longer in the data file."""
+        current = set(ids)
+        stale = [doc_id for doc_id in self.vectorstore.get(include=[])["ids"] if doc_id not in current]
+        if stale:
+            self.vectorstore.delete(ids=stale)
+    
+    def _finish_ingest(self, corpus_hash: str) -> None:
+        """Record the ingested corpus hash, drop the in-memory index and persist to disk."""
+        collection = self.vectorstore._collection
+        metadata = {
+            key: value for key, value in (collection.metadata or {}).items()
+            if key != "hnsw:space"  # Chroma rejects it in modify(); the index keeps its own copy
+        }
+        collection.modify(metadata={**metadata, CORPUS_HASH_KEY: corpus_hash})
         
-        # Clear existing data to prevent duplicates
+        self._all_documents = None
+        self._embedding_matrix = None
+        self.vectorstore.persist()
+    
+    def _reset_collection(self) -> None:
+        """Delete the collection and reopen it empty, to prevent duplicates."""
+        self._all_documents = None
+        self._embedding_matrix = None
         self.vectorstore.delete_collection()
         self.vectorstore = Chroma(
             persist_directory=self.persist_directory,
             embedding_function=self.embeddings,
-            collection_name=self.collection_name
+            collection_name=self.collection_name,
+            collection_metadata=self._collection_metadata()
         )
+    
+    def ingest_transactions(self, force_recreate: bool = False) -> None:
+        """
+        Ingest transaction data into the vector store.
+        Creates embeddings for all transactions and stores them.
         
-        # Add documents to vector store with unique IDs
-        ids = [f"txn_{metadata['id']}" for metadata in transaction_metadata]
+        Skipped when the persisted collection was built from the same transactions.
+        Otherwise documents are upserted by ID, so only new or changed transactions
+        are embedded (the rest come from the embedding cache).
+        
+        Args:
+            force_recreate: If True, delete the collection and rebuild it from scratch
+        """
+        if self.vectorstore is None:
+            self.initialize_store()
+        
+        documents, ids = self._build_documents()
+        corpus_hash = self._corpus_hash([doc.page_content for doc in documents])
+        
+        if force_recreate:
+            self._reset_collection()
+        elif self._is_up_to_date(corpus_hash, ids):
+            print(f"Vector store is up to date with {len(documents)} transactions")
+            return
+        
+        print(f"Ingesting {len(documents)} transactions into vector store...")
+        
+        self._remove_stale_documents(ids)
+        
+        # Upsert documents with unique IDs
         self.vectorstore.add_documents(documents, ids=ids)
         
-        # Persist to disk
-        self.vectorstore.persist()
+        self._finish_ingest(corpus_hash)
         
         print(f"Successfully ingested {len(documents)} transactions!")
     
+    async def _aembed_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts with concurrent batched requests.
+        
+        Texts are sorted by length before batching so each batch holds similarly
+        sized inputs; the embeddings are returned in the original order.
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            One embedding per text
+        """
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = [
+            order[start:start + EMBED_BATCH_SIZE]
+            for start in range(0, len(order), EMBED_BATCH_SIZE)
+        ]
+        
+        results = await asyncio.gather(*(
+            self.embeddings.aembed_documents([texts[i] for i in batch])
+            for batch in batches
+        ))
+        
+        embeddings: List[List[float]] = [[] for _ in texts]
+        for batch, batch_embeddings in zip(batches, results):
+            for i, embedding in zip(batch, batch_embeddings):
+                embeddings[i] = embedding
+        return embeddings
+    
+    async def aingest_transactions(self, force_recreate: bool = False) -> None:
+        """
+        Async version of ingest_transactions that embeds transactions in
+        concurrent batches before writing them to the vector store.
+        
+        Args:
+            force_recreate: If True, delete the collection and rebuild it from scratch
+        """
+        if self.vectorstore is None:
+            self.initialize_store()
+        
+        documents, ids = self._build_documents()
+        texts = [doc.page_content for doc in documents]
+        corpus_hash = self._corpus_hash(texts)
+        
+        if force_recreate:
+            self._reset_collection()
+        elif self._is_up_to_date(corpus_hash, ids):
+            print(f"Vector store is up to date with {len(documents)} transactions")
+            return
+        
+        print(f"Ingesting {len(documents)} transactions into vector store...")
+        
+        embeddings = await self._aembed_texts(texts)
+        
+        self._remove_stale_documents(ids)
+        
+        # Upsert the precomputed embeddings with unique IDs
+        self.vectorstore._collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            metadatas=[doc.metadata for doc in documents],
+            documents=texts
+        )
+        
+        self._finish_ingest(corpus_hash)
+        
+        print(f"Successfully ingested {len(documents)} transactions!")
+    
+    def _load_index(self) -> None:
+        """
+        Load every document and its embedding from the vector store into memory,
+        ordered by transaction ID, with the embeddings as a normalized float32 matrix.
+        """
+        if self.vectorstore is None:
+            self.initialize_store()
+        
+        data = self.vectorstore.get(include=["embeddings", "documents", "metadatas"])
+        order = sorted(range(len(data["ids"])), key=lambda i: data["metadatas"][i].get("id", 0))
+        
+        self._all_documents = [
+            Document(page_content=data["documents"][i], metadata=data["metadatas"][i])
+            for i in order
+        ]
+        matrix = np.asarray([data["embeddings"][i] for i in order], dtype=np.float32)
+        if matrix.size:
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1, norms)
+        self._embedding_matrix = matrix
+        
+        self._metadata_codes = {}
+        for key in FILTER_KEYS:
+            self._encode_metadata(key)
+    
+    def _encode_metadata(self, key: str) -> Tuple[np.ndarray, Dict[Any, int]]:
+        """Encode a metadata key's values as integer codes, one per document, memoized per load."""
+        if key not in self._metadata_codes:
+            value_codes: Dict[Any, int] = {}
+            codes = np.fromiter(
+                (value_codes.setdefault(doc.metadata.get(key), len(value_codes)) for doc in self._all_documents),
+                dtype=np.int64,
+                count=len(self._all_documents)
+            )
+            self._metadata_codes[key] = (codes, value_codes)
+        return self._metadata_codes[key]
+    
+    def get_all_documents(self) -> List[Document]:
+        """
+        Get every document in the vector store, ordered by transaction ID.
+        The result is memoized until the transactions are re-ingested.
+        
+        Returns:
+            List of all transaction documents
+        """
+        if self._all_documents is None:
+            self._load_index()
+        
+        return self._all_documents
+
+    def get_corpus_hash(self) -> str:
+        """
+        Get the hash of the ingested corpus, which changes whenever the transactions do.
+
+        Returns:
+            Corpus hash, or an empty string if nothing has been ingested
+        """
+        return self._stored_corpus_hash() or ""
+
+    def _scores(
+        self,
+        query_embedding: List[float],
+        conditions: Optional[List[Dict[str, str]]] = None
+    ) -> np.ndarray:
+        """Cosine similarity of every document to the query; -inf where the conditions don't match."""
+        if self._embedding_matrix is None:
+            self._load_index()
+        
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        scores = self._embedding_matrix @ (query / norm if norm else query)
+        
+        for condition in conditions or []:
+            for key, value in condition.items():
+                codes, value_codes = self._encode_metadata(key)
+                scores[codes != value_codes.get(value, -1)] = -np.inf
+        return scores
+    
+    def _top_k(self, scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k highest finite scores, best first."""
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        idx = np.argpartition(-scores, k - 1)[:k]
+        return idx[np.argsort(-scores[idx], kind="stable")]
+    
+    def fast_search(
+        self,
+        query_embedding: List[float],
+        k: int,
+        conditions: Optional[List[Dict[str, str]]] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Brute-force cosine search over the in-memory embedding matrix.
+        
+        For a small corpus a single matrix-vector product is much faster than a
+        round-trip through Chroma's HNSW index, and exact.
+        
+        Args:
+            query_embedding: Query embedding
+            k: Number of results to return
+            conditions: Metadata key/value pairs every result must match
+            
+        Returns:
+            List of (document, cosine similarity), most similar first
+        """
+        scores = self._scores(query_embedding, conditions)
+        return [(self._all_documents[i], float(scores[i])) for i in self._top_k(scores, k)]
+    
+    def fast_mmr_search(self, query_embedding: List[float], k: int, fetch_k: int) -> List[Document]:
+        """
+        Maximal marginal relevance search over the in-memory embedding matrix:
+        take the fetch_k most similar documents, then pick k diverse ones among them.
+        
+        Args:
+            query_embedding: Query embedding
+            k: Number of results to return
+            fetch_k: Number of candidates to choose from
+            
+        Returns:
+            List of selected documents
+        """
+        candidates = self._top_k(self._scores(query_embedding), fetch_k)
+        selected = maximal_marginal_relevance(
+            np.asarray(query_embedding, dtype=np.float32),
+            self._embedding_matrix[candidates],
+            k=min(k, len(candidates))
+        )
+        return [self._all_documents[candidates[i]] for i in selected]
+    
     def get_retriever(self, top_k: int = 3):
         """
         Get a retriever for similarity-based search.
@@ -150,11 +543,8 @@ class VectorStoreManager:
         Returns:
             List of most relevant transaction documents
         """
-        if self.vectorstore is None:
-            self.initialize_store()
-        
-        results = self.vectorstore.similarity_search(query, k=top_k)
-        return results
+        query_embedding = self.embeddings.embed_query(query)
+        return [doc for doc, _ in self.fast_search(query_embedding, top_k)]
 
 
 def setup_vector_store(force_recreate: bool = False) -> VectorStoreManager:
@@ -170,11 +560,27 @@ def setup_vector_store(force_recreate: bool = False) -> VectorStoreManager:
     manager = VectorStoreManager()
     manager.initialize_store(force_recreate=force_recreate)
     
-    # Check if we need to ingest data
-    if force_recreate or manager.vectorstore._collection.count() == 0:
-        manager.ingest_transactions()
-    else:
-        print(f"Vector store already contains {manager.vectorstore._collection.count()} documents")
+    # Ingests only if the persisted collection is missing or out of date
+    manager.ingest_transactions(force_recreate=force_recreate)
+    
+    return manager
+
+
+async def asetup_vector_store(force_recreate: bool = False) -> VectorStoreManager:
+    """
+    Async version of setup_vector_store that embeds transactions in concurrent batches.
+    
+    Args:
+        force_recreate: Whether to recreate the vector store from scratch
+        
+    Returns:
+        Initialized VectorStoreManager
+    """
+    manager = VectorStoreManager()
+    manager.initialize_store(force_recreate=force_recreate)
+    
+    # Ingests only if the persisted collection is missing or out of date
+    await manager.aingest_transactions(force_recreate=force_recreate)
     
     return manager
 
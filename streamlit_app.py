@@ -1,9 +1,13 @@
 """Streamlit UI for RAG Chatbot with charts and memory (latest Q/A only, no loops)."""
 import os
+import json
+import time
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Page config
 st.set_page_config(
@@ -29,48 +33,91 @@ if "input_key" not in st.session_state:
 # Support both FASTAPI_URL (Render) and API_BASE (legacy) for backwards compatibility
 API_BASE = os.getenv("FASTAPI_URL", os.getenv("API_BASE", "http://localhost:8000"))
 
+# Shared keep-alive session so API calls reuse pooled connections
+SESSION = requests.Session()
+SESSION.headers.update({"Connection": "keep-alive"})
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.1),
+)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+# Health probes fail fast instead of retrying: an unreachable endpoint would
+# otherwise cost several timeouts before the next candidate is tried
+PROBE_SESSION = requests.Session()
+PROBE_SESSION.headers.update({"Connection": "keep-alive"})
+_probe_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=0)
+PROBE_SESSION.mount("http://", _probe_adapter)
+PROBE_SESSION.mount("https://", _probe_adapter)
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _fetch_transactions(api_base: str):
+    """Fetch transactions from the API; errors propagate so failures aren't cached."""
+    response = SESSION.get(f"{api_base}/transactions", timeout=5)
+    response.raise_for_status()
+    return response.json().get("transactions", [])
+
 
 def get_transactions():
-    """Get transactions from API."""
+    """Get transactions from API (cached for 30 seconds)."""
     try:
-        response = requests.get(f"{API_BASE}/transactions", timeout=5)
-        if response.status_code == 200:
-            return response.json().get("transactions", [])
-        return []
+        return _fetch_transactions(API_BASE)
     except Exception:
         return []
 
 
-def chat_with_bot(query: str):
-    """Send query to chatbot API."""
+def stream_chat_with_bot(query: str):
+    """Send query to the chatbot's streaming API, yielding answer chunks as they arrive."""
     try:
-        response = requests.post(
-            f"{API_BASE}/chat",
+        with SESSION.post(
+            f"{API_BASE}/chat/stream",
             json={"query": query, "use_memory": True},
             timeout=10,
-        )
-        if response.status_code == 200:
-            return response.json()
-        # if API returned an error body
-        try:
-            detail = response.json().get("detail", "Unknown error")
-        except Exception:
-            detail = "Unknown error"
-        return {"answer": f"API Error: {detail}", "sources": []}
+            stream=True,
+        ) as response:
+            if response.status_code != 200:
+                # if API returned an error body
+                try:
+                    detail = response.json().get("detail", "Unknown error")
+                except Exception:
+                    detail = "Unknown error"
+                yield f"API Error: {detail}"
+                return
+
+            # Server-Sent Events: 'data: {"token": ...}' lines, ending with 'data: [DONE]'
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data: "):
+                    continue
+                data = line[len("data: "):]
+                if data == "[DONE]":
+                    break
+                yield json.loads(data)["token"]
     except Exception as e:
-        return {"answer": f"Connection error: {str(e)}", "sources": []}
+        yield f"Connection error: {str(e)}"
 
 
 # ---------------- Charts ----------------
+@st.cache_data(show_spinner=False)
+def _prepare_df(transactions) -> pd.DataFrame:
+    """Build the transactions frame once, with parsed dates and a month column."""
+    df = pd.DataFrame(transactions)
+    if not df.empty:
+        df["date"] = pd.to_datetime(df["date"])
+        df["month"] = df["date"].dt.to_period("M").astype(str)
+    return df
+
+
+# Figures are memoized on the dataframe's contents, so reruns reuse them
+@st.cache_data(show_spinner=False)
 def create_monthly_chart(df: pd.DataFrame):
     """Create monthly spending chart."""
     if df.empty:
         return None
 
-    df = df.copy()
-    df["date"] = pd.to_datetime(df["date"])
-    df["month"] = df["date"].dt.to_period("M").astype(str)
-    monthly_spending = df.groupby("month")["amount"].sum().reset_index()
+    monthly_spending = df.groupby("month", sort=True)["amount"].sum().reset_index()
 
     fig = px.line(
         monthly_spending,
@@ -83,13 +130,15 @@ def create_monthly_chart(df: pd.DataFrame):
     return fig
 
 
+@st.cache_data(show_spinner=False)
 def create_customer_chart(df: pd.DataFrame):
     """Create customer spending chart."""
     if df.empty:
         return None
 
-    customer_spending = df.groupby("customer")["amount"].sum().reset_index()
-    customer_spending = customer_spending.sort_values("amount", ascending=False)
+    customer_spending = (
+        df.groupby("customer")["amount"].sum().sort_values(ascending=False).reset_index()
+    )
 
     fig = px.bar(
         customer_spending,
@@ -103,24 +152,38 @@ def create_customer_chart(df: pd.DataFrame):
 
 
 # ---------------- API Health Check ----------------
+# Seconds a discovered API base URL is trusted before it is probed again
+API_STATUS_MAX_AGE = 60
+
+
 def check_api_status():
+    """
+    Find a reachable API base URL, remembering it in the session so reruns
+    don't probe again until it is API_STATUS_MAX_AGE seconds old.
+    """
     global API_BASE
-    # Check configured URL first (Render/production), then Docker, then localhost
-    endpoints = [API_BASE, "http://fastapi:8000", "http://localhost:8000"]
-    
-    # Remove duplicates while preserving order
-    seen = set()
-    unique_endpoints = []
-    for endpoint in endpoints:
-        if endpoint not in seen:
-            seen.add(endpoint)
-            unique_endpoints.append(endpoint)
+    checked_at = st.session_state.get("api_checked_at", 0)
+    if "api_base" in st.session_state and time.monotonic() - checked_at < API_STATUS_MAX_AGE:
+        API_BASE = st.session_state.api_base
+        return True
+
+    # Check the last working URL first, then the configured URL (Render/production),
+    # then Docker, then localhost; dict.fromkeys drops duplicates, preserving order
+    endpoints = dict.fromkeys([
+        st.session_state.get("api_base", API_BASE),
+        API_BASE,
+        "http://fastapi:8000",
+        "http://localhost:8000",
+    ])
+    st.session_state.pop("api_base", None)
 
-    for endpoint in unique_endpoints:
+    for endpoint in endpoints:
         try:
-            response = requests.get(f"{endpoint}/health", timeout=5)
+            response = PROBE_SESSION.get(f"{endpoint}/health", timeout=0.5)
             if response.status_code == 200:
                 API_BASE = endpoint
+                st.session_state.api_base = endpoint
+                st.session_state.api_checked_at = time.monotonic()
                 return True
         except Exception as e:
             print(f"Failed to connect to {endpoint}: {e}")
@@ -131,22 +194,29 @@ def check_api_status():
 # ---------------- UI Layout ----------------
 st.title("🤖 RAG-Powered Transactional Chatbot")
 
-# API Status indicator
-api_online = check_api_status()
-if api_online:
-    st.success("✅ Backend API is online - Full RAG functionality available")
-else:
-    st.warning("⚠️ Backend API is offline - Using local fallback mode")
+
+# API Status indicator, re-probed in the background without rerunning the page
+@st.fragment(run_every=API_STATUS_MAX_AGE)
+def render_api_status():
+    if check_api_status():
+        st.success("✅ Backend API is online - Full RAG functionality available")
+    else:
+        st.warning("⚠️ Backend API is offline - Using local fallback mode")
+
+
+render_api_status()
 
 st.markdown("Ask questions about customer transactions using natural language!")
 
 # ----- Sidebar: Analytics -----
-with st.sidebar:
+# A fragment, so interacting with the sidebar reruns only the sidebar
+@st.fragment
+def render_analytics():
     st.header("📊 Analytics")
 
     transactions = get_transactions()
     if transactions:
-        df = pd.DataFrame(transactions)
+        df = _prepare_df(transactions)
 
         # Monthly spending chart
         monthly_fig = create_monthly_chart(df)
@@ -166,6 +236,10 @@ with st.sidebar:
     else:
         st.error("Could not load transaction data - API may be offline")
 
+
+with st.sidebar:
+    render_analytics()
+
 # ----- Main chat area -----
 col1, col2 = st.columns([3, 1])
 
@@ -207,17 +281,15 @@ if user_input:
     st.session_state.messages.append({"role": "user", "content": user_input})
     st.session_state.last_question = user_input
 
-    # Get bot response
-    with st.spinner("Thinking..."):
-        response = chat_with_bot(user_input)
-        answer = response["answer"]
+    # Render the new turn in place, streaming the answer, instead of rerunning the script
+    with chat_container:
+        with st.chat_message("user"):
+            st.markdown(user_input)
+        with st.chat_message("assistant"):
+            answer = st.write_stream(stream_chat_with_bot(user_input))
 
     # Add assistant message
     st.session_state.messages.append({"role": "assistant", "content": answer})
-    
-    # Increment key to reset input
-    st.session_state.input_key += 1
-    st.rerun()
 
 # ----- Footer -----
 st.markdown("---")
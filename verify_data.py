@@ -4,6 +4,8 @@
 import json
 from pathlib import Path
 
+import pandas as pd
+
 def verify_transaction_data():
     """Verify all 7 customers and 14 transactions are in the data file."""
     print("=" * 80)
@@ -12,49 +14,41 @@ def verify_transaction_data():
     
     # Load transactions
     with open("transactions.json", 'r', encoding='utf-8') as f:
-        transactions = json.load(f)
+        df = pd.DataFrame(json.load(f))
     
-    print(f"\n[OK] Loaded {len(transactions)} transactions from transactions.json")
+    print(f"\n[OK] Loaded {len(df)} transactions from transactions.json")
     
     # Verify count
-    assert len(transactions) == 14, f"Expected 14 transactions, got {len(transactions)}"
+    assert len(df) == 14, f"Expected 14 transactions, got {len(df)}"
     
     # Get unique customers
-    customers = set(txn['customer'] for txn in transactions)
-    print(f"[OK] Found {len(customers)} unique customers")
+    customer_count = df["customer"].nunique()
+    print(f"[OK] Found {customer_count} unique customers")
     
     # Verify customer count
-    assert len(customers) == 7, f"Expected 7 customers, got {len(customers)}"
+    assert customer_count == 7, f"Expected 7 customers, got {customer_count}"
     
     # Calculate totals
-    total_spending = sum(txn['amount'] for txn in transactions)
+    total_spending = df["amount"].sum()
     print(f"[OK] Total spending across all customers: Rs.{total_spending:,}")
     
     # Verify expected total
     expected_total = 203900
     assert total_spending == expected_total, f"Expected total Rs.{expected_total:,}, got Rs.{total_spending:,}"
     
+    # Per-customer count and total in one grouped pass (customers sorted alphabetically)
+    totals = df.groupby("customer")["amount"].agg(["count", "sum"])
+    
     # Show detailed breakdown
     print("\n" + "=" * 80)
     print("DETAILED BREAKDOWN BY CUSTOMER")
     print("=" * 80)
     
-    customer_data = {}
-    for txn in transactions:
-        customer = txn['customer']
-        if customer not in customer_data:
-            customer_data[customer] = []
-        customer_data[customer].append(txn)
-    
-    # Sort customers alphabetically
-    for customer in sorted(customer_data.keys()):
-        txns = customer_data[customer]
-        total = sum(t['amount'] for t in txns)
-        
+    for customer, txns in df.sort_values("date", kind="stable").groupby("customer"):
         print(f"\n{customer}:")
-        for txn in sorted(txns, key=lambda x: x['date']):
-            print(f"  Transaction ID {txn['id']}: {txn['date']} - {txn['product']} - Rs.{txn['amount']:,}")
-        print(f"  Total for {customer}: Rs.{total:,}")
+        for txn in txns.itertuples(index=False):
+            print(f"  Transaction ID {txn.id}: {txn.date} - {txn.product} - Rs.{txn.amount:,}")
+        print(f"  Total for {customer}: Rs.{totals.at[customer, 'sum']:,}")
     
     # Summary table
     print("\n" + "=" * 80)
@@ -63,22 +57,20 @@ def verify_transaction_data():
     print(f"{'Customer':<15} {'Transactions':<15} {'Total Spending':<20}")
     print("-" * 80)
     
-    for customer in sorted(customer_data.keys()):
-        txns = customer_data[customer]
-        total = sum(t['amount'] for t in txns)
-        print(f"{customer:<15} {len(txns):<15} Rs.{total:,}")
+    for customer, row in totals.iterrows():
+        print(f"{customer:<15} {row['count']:<15} Rs.{row['sum']:,}")
     
     print("-" * 80)
-    print(f"{'TOTAL':<15} {len(transactions):<15} Rs.{total_spending:,}")
+    print(f"{'TOTAL':<15} {len(df):<15} Rs.{total_spending:,}")
     print("=" * 80)
     
     # Verify each customer has exactly 2 transactions
     print("\n[VERIFICATION CHECKS]")
-    for customer in sorted(customer_data.keys()):
-        txn_count = len(customer_data[customer])
+    for customer, txn_count in totals["count"].items():
         status = "[OK]" if txn_count == 2 else "[ERROR]"
         print(f"{status} {customer}: {txn_count} transactions")
-        assert txn_count == 2, f"{customer} should have 2 transactions, got {txn_count}"
+    bad = totals.index[totals["count"] != 2].tolist()
+    assert not bad, f"{', '.join(bad)} should each have 2 transactions"
     
     print("\n" + "=" * 80)
     print("*** ALL VERIFICATIONS PASSED! ***")